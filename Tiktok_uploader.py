@@ -76,9 +76,10 @@ def uploadVideo(session_id, video, title, tags, schedule_time=0, verbose=True):
 	url = "https://www.tiktok.com/api/v1/video/upload/auth/"
 	r = session.get(url)
 	assertSuccess(url, r)
-	access_key = r.json()["video_token_v5"]["access_key_id"]
-	secret_key = r.json()["video_token_v5"]["secret_acess_key"]
-	session_token = r.json()["video_token_v5"]["session_token"]
+	video_token = r.json()["video_token_v5"]
+	access_key = video_token["access_key_id"]
+	secret_key = video_token["secret_acess_key"]
+	session_token = video_token["session_token"]
 
 	with open(video, "rb") as f:
 		video_content = f.read()
@@ -101,8 +102,9 @@ def uploadVideo(session_id, video, title, tags, schedule_time=0, verbose=True):
 		return False
 	upload_node = r.json()["Result"]["InnerUploadAddress"]["UploadNodes"][0]
 	video_id = upload_node["Vid"]
-	store_uri = upload_node["StoreInfos"][0]["StoreUri"]
-	video_auth = upload_node["StoreInfos"][0]["Auth"]
+	store_info = upload_node["StoreInfos"][0]
+	store_uri = store_info["StoreUri"]
+	video_auth = store_info["Auth"]
 	upload_host = upload_node["UploadHost"]
 	session_key = upload_node["SessionKey"]
 
@@ -119,18 +121,11 @@ def uploadVideo(session_id, video, title, tags, schedule_time=0, verbose=True):
 		return False
 	upload_id = r.json()["payload"]["uploadID"]
 
-	# Split file in chunks of 5242880 bytes
+	# Upload file in chunks of 5242880 bytes, slicing each one only when it is sent
 	chunk_size = 5242880
-	chunks = []
-	i = 0
-	while i < file_size:
-		chunks.append(video_content[i:i+chunk_size])
-		i += chunk_size
-
-	# Upload chunks
 	crcs = []
-	for i in range(len(chunks)):
-		chunk = chunks[i]
+	for i, offset in enumerate(range(0, file_size, chunk_size)):
+		chunk = video_content[offset:offset+chunk_size]
 		crc = crc32(chunk)
 		crcs.append(crc)
 		url = f"https://{upload_host}/{store_uri}?partNumber={i+1}&uploadID={upload_id}"
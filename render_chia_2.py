@@ -1,13 +1,15 @@
 import os
 import subprocess
-from glob import glob
 import random
+from itertools import cycle
+from functools import lru_cache
 from concurrent.futures import ProcessPoolExecutor
 
 def run_ffmpeg(cmd):
     print("▶️ Running:", ' '.join(cmd))
     subprocess.run(cmd, check=True)
 
+@lru_cache(maxsize=None)
 def get_video_duration(path):
     result = subprocess.run(
         ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of",
@@ -15,6 +17,32 @@ def get_video_duration(path):
         stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
     return float(result.stdout.decode().strip())
 
+# Liệt kê file .mp4 trong thư mục bằng một lần os.scandir
+def list_videos(directory):
+    try:
+        with os.scandir(directory) as it:
+            return sorted(entry.path for entry in it
+                          if entry.name.endswith(".mp4") and not entry.name.startswith(".")
+                          and entry.is_file())
+    except FileNotFoundError:
+        return []
+
+# Lọc video đã render bằng một lần quét output/ thay vì stat từng file
+def skip_rendered(videos, output_dir="output"):
+    try:
+        with os.scandir(output_dir) as it:
+            rendered = {entry.name for entry in it}
+    except FileNotFoundError:
+        return list(videos)
+    pending = []
+    for video in videos:
+        output_name = os.path.splitext(os.path.basename(video))[0] + ".mp4"
+        if output_name in rendered:
+            print(f"⏩ Bỏ qua: {output_dir}/{output_name} đã tồn tại.")
+        else:
+            pending.append(video)
+    return pending
+
 def render_single(main_video, bg_video, index):
     video_name = os.path.splitext(os.path.basename(main_video))[0]
     output_file = f"output/{video_name}.mp4"
@@ -75,16 +103,24 @@ def render_single(main_video, bg_video, index):
 
 def render_all():
     os.makedirs("output", exist_ok=True)
-    download_videos = sorted(glob("dongphuc/*.mp4"))
-    background_videos = sorted(glob("video_chia_2/*.mp4"))
+    download_videos = list_videos("dongphuc")
+    background_videos = list_videos("video_chia_2")
 
     if not download_videos or not background_videos:
         print("❌ Thiếu video trong downloads/ hoặc video_chia_2/")
         return
 
+    download_videos = skip_rendered(download_videos)
+    if not download_videos:
+        print("✅ Tất cả video đã được render")
+        return
+
+    # Xáo trộn nền một lần, mỗi video lấy nền kế tiếp
+    bg_cycle = cycle(random.sample(background_videos, len(background_videos)))
+
     with ProcessPoolExecutor() as executor:
         for idx, main_video in enumerate(download_videos):
-            bg_video = random.choice(background_videos)
+            bg_video = next(bg_cycle)
             print(f"\n🎬 Rendering {os.path.basename(main_video)} with background {os.path.basename(bg_video)}...")
             executor.submit(render_single, main_video, bg_video, idx)
 
@@ -2,18 +2,25 @@ import os
 import subprocess
 from glob import glob
 import random
+from itertools import cycle
+from functools import lru_cache
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import tempfile
 import json
 
+@lru_cache(maxsize=None)
 def check_gpu_support():
-    """Kiểm tra GPU support cho encoding"""
+    """Kiểm tra GPU support cho encoding (chỉ chạy ffmpeg -encoders một lần)"""
     try:
         result = subprocess.run(
             ["ffmpeg", "-hide_banner", "-encoders"], 
             capture_output=True, text=True
         )
-        encoders = result.stdout
+        # Tên encoder là cột thứ 2 của mỗi dòng; frozenset cho phép so khớp chính xác, O(1)
+        encoders = frozenset(
+            parts[1] for parts in map(str.split, result.stdout.splitlines())
+            if len(parts) > 1
+        )
         return {
             'nvenc': 'h264_nvenc' in encoders,
             'qsv': 'h264_qsv' in encoders,
@@ -40,16 +47,34 @@ def run_ffmpeg(cmd, silent=False):
         print("▶️ Running:", ' '.join(cmd))
     subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL if silent else None)
 
-def get_video_duration(path):
-    """Cache video duration với persistent cache"""
-    cache_file = "duration_cache.json"
-    
-    # Load cache từ file
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
-    else:
-        cache = {}
+DURATION_CACHE_FILE = "duration_cache.json"
+_duration_cache = {}
+_duration_cache_mtime = None
+
+def load_duration_cache():
+    """Đọc cache duration từ file, chỉ parse lại khi mtime của file thay đổi"""
+    global _duration_cache_mtime
+    try:
+        mtime = os.stat(DURATION_CACHE_FILE).st_mtime
+        if mtime != _duration_cache_mtime:
+            with open(DURATION_CACHE_FILE, 'r') as f:
+                _duration_cache.update(json.load(f))
+            _duration_cache_mtime = mtime
+    except (OSError, ValueError):
+        # Không đọc được file (chưa có hoặc đang được ghi) → dùng cache hiện có
+        pass
+    return _duration_cache
+
+def save_duration_cache():
+    """Ghi cache duration ra file và ghi nhớ mtime để không đọc lại chính nó"""
+    global _duration_cache_mtime
+    with open(DURATION_CACHE_FILE, 'w') as f:
+        json.dump(_duration_cache, f)
+    _duration_cache_mtime = os.stat(DURATION_CACHE_FILE).st_mtime
+
+def get_video_duration(path, persist=True):
+    """Cache video duration với persistent cache (persist=False: chỉ lưu trong bộ nhớ)"""
+    cache = load_duration_cache()
     
     if path in cache:
         return cache[path]
@@ -62,11 +87,37 @@ def get_video_duration(path):
     
     # Save to cache
     cache[path] = duration
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
+    if persist:
+        save_duration_cache()
     
     return duration
 
+def list_videos(directory):
+    """Liệt kê file .mp4 trong thư mục bằng một lần os.scandir"""
+    try:
+        with os.scandir(directory) as it:
+            return sorted(entry.path for entry in it
+                          if entry.name.endswith(".mp4") and not entry.name.startswith(".")
+                          and entry.is_file())
+    except FileNotFoundError:
+        return []
+
+def skip_rendered(videos, output_dir="output"):
+    """Lọc video đã render bằng một lần quét output/ thay vì stat từng file"""
+    try:
+        with os.scandir(output_dir) as it:
+            rendered = {entry.name for entry in it}
+    except FileNotFoundError:
+        return list(videos)
+    pending = []
+    for video in videos:
+        output_name = os.path.splitext(os.path.basename(video))[0] + ".mp4"
+        if output_name in rendered:
+            print(f"⏩ Bỏ qua: {output_dir}/{output_name} đã tồn tại.")
+        else:
+            pending.append(video)
+    return pending
+
 def create_background_loop_optimized(bg_video, target_duration, temp_dir, encoder, encoder_args):
     """Tạo background loop với tối ưu hóa"""
     bg_duration = get_video_duration(bg_video)
@@ -85,7 +136,7 @@ def create_background_loop_optimized(bg_video, target_duration, temp_dir, encode
     
     return temp_bg_loop
 
-def render_single_gpu_optimized(main_video, bg_video, index):
+def render_single_gpu_optimized(main_video, bg_video, index, encoder_spec):
     video_name = os.path.splitext(os.path.basename(main_video))[0]
     output_file = f"output/{video_name}.mp4"
 
@@ -93,9 +144,7 @@ def render_single_gpu_optimized(main_video, bg_video, index):
         print(f"⏩ Bỏ qua: {output_file} đã tồn tại.")
         return
 
-    # Chọn encoder tốt nhất
-    encoder, *encoder_args = get_best_encoder()
-    print(f"🎯 Sử dụng encoder: {encoder}")
+    encoder, *encoder_args = encoder_spec
 
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_main = os.path.join(temp_dir, "main_speed.mp4")
@@ -141,20 +190,32 @@ def preprocess_backgrounds(background_videos):
     """Tiền xử lý với progress bar"""
     print("🔄 Đang cache thông tin background videos...")
     total = len(background_videos)
+    cache = load_duration_cache()
+    new_entries = 0
     for i, bg_video in enumerate(background_videos, 1):
-        get_video_duration(bg_video)
+        if bg_video not in cache:
+            new_entries += 1
+        get_video_duration(bg_video, persist=False)
         print(f"\r📊 Progress: {i}/{total} ({i/total*100:.1f}%)", end="")
+    # Ghi file một lần sau khi probe xong, và chỉ khi có duration mới
+    if new_entries:
+        save_duration_cache()
     print(f"\n✅ Đã cache {total} background videos")
 
 def render_all_gpu_optimized():
     os.makedirs("output", exist_ok=True)
-    download_videos = sorted(glob("dongphuc/*.mp4"))
-    background_videos = sorted(glob("video_chia_2/*.mp4"))
+    download_videos = list_videos("dongphuc")
+    background_videos = list_videos("video_chia_2")
 
     if not download_videos or not background_videos:
         print("❌ Thiếu video trong dongphuc/ hoặc video_chia_2/")
         return
 
+    download_videos = skip_rendered(download_videos)
+    if not download_videos:
+        print("✅ Tất cả video đã được render")
+        return
+
     # Kiểm tra GPU support
     gpu_support = check_gpu_support()
     print("🔍 GPU Support:", gpu_support)
@@ -171,13 +232,20 @@ def render_all_gpu_optimized():
     
     print(f"🚀 Sử dụng {max_workers} processes để render")
     
+    # Chọn encoder tốt nhất một lần cho tất cả video
+    encoder_spec = get_best_encoder()
+    print(f"🎯 Sử dụng encoder: {encoder_spec[0]}")
+    
+    # Xáo trộn danh sách nền một lần và dùng lần lượt
+    bg_cycle = cycle(random.sample(background_videos, len(background_videos)))
+    
     # Submit tasks với progress tracking
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
         futures = []
         for idx, main_video in enumerate(download_videos):
-            bg_video = random.choice(background_videos)
+            bg_video = next(bg_cycle)
             print(f"📋 Queue {idx+1}/{len(download_videos)}: {os.path.basename(main_video)}")
-            future = executor.submit(render_single_gpu_optimized, main_video, bg_video, idx)
+            future = executor.submit(render_single_gpu_optimized, main_video, bg_video, idx, encoder_spec)
             futures.append(future)
         
         # Track progress
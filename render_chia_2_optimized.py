@@ -2,6 +2,7 @@ import os
 import subprocess
 from glob import glob
 import random
+from itertools import cycle
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import tempfile
 
@@ -10,22 +11,47 @@ def run_ffmpeg(cmd, silent=False):
         print("▶️ Running:", ' '.join(cmd))
     subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL if silent else None)
 
+_duration_cache = {}
+
 def get_video_duration(path):
     """Cache video duration để tránh gọi ffprobe nhiều lần"""
-    if not hasattr(get_video_duration, 'cache'):
-        get_video_duration.cache = {}
-    
-    if path in get_video_duration.cache:
-        return get_video_duration.cache[path]
+    if path in _duration_cache:
+        return _duration_cache[path]
     
     result = subprocess.run(
         ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of",
          "default=noprint_wrappers=1:nokey=1", path],
         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
     duration = float(result.stdout.strip())
-    get_video_duration.cache[path] = duration
+    _duration_cache[path] = duration
     return duration
 
+def list_videos(directory):
+    """Liệt kê file .mp4 trong thư mục bằng một lần os.scandir"""
+    try:
+        with os.scandir(directory) as it:
+            return sorted(entry.path for entry in it
+                          if entry.name.endswith(".mp4") and not entry.name.startswith(".")
+                          and entry.is_file())
+    except FileNotFoundError:
+        return []
+
+def skip_rendered(videos, output_dir="output"):
+    """Lọc video đã render bằng một lần quét output/ thay vì stat từng file"""
+    try:
+        with os.scandir(output_dir) as it:
+            rendered = {entry.name for entry in it}
+    except FileNotFoundError:
+        return list(videos)
+    pending = []
+    for video in videos:
+        output_name = os.path.splitext(os.path.basename(video))[0] + ".mp4"
+        if output_name in rendered:
+            print(f"⏩ Bỏ qua: {output_dir}/{output_name} đã tồn tại.")
+        else:
+            pending.append(video)
+    return pending
+
 def create_background_loop(bg_video, target_duration, temp_dir):
     """Tạo video nền loop với thời lượng mong muốn"""
     bg_duration = get_video_duration(bg_video)
@@ -102,13 +128,18 @@ def preprocess_backgrounds(background_videos):
 
 def render_all_optimized():
     os.makedirs("output", exist_ok=True)
-    download_videos = sorted(glob("dongphuc/*.mp4"))
-    background_videos = sorted(glob("video_chia_2/*.mp4"))
+    download_videos = list_videos("dongphuc")
+    background_videos = list_videos("video_chia_2")
 
     if not download_videos or not background_videos:
         print("❌ Thiếu video trong dongphuc/ hoặc video_chia_2/")
         return
 
+    download_videos = skip_rendered(download_videos)
+    if not download_videos:
+        print("✅ Tất cả video đã được render")
+        return
+
     # Tiền xử lý để cache duration
     preprocess_backgrounds(background_videos)
     
@@ -116,11 +147,14 @@ def render_all_optimized():
     max_workers = min(os.cpu_count(), len(download_videos))
     print(f"🚀 Sử dụng {max_workers} processes để render")
     
+    # Chia đều nền: xáo trộn một lần rồi quay vòng
+    bg_cycle = cycle(random.sample(background_videos, len(background_videos)))
+    
     # Submit tất cả tasks và đợi hoàn thành
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
         futures = []
         for idx, main_video in enumerate(download_videos):
-            bg_video = random.choice(background_videos)
+            bg_video = next(bg_cycle)
             print(f"📋 Queue: {os.path.basename(main_video)} + {os.path.basename(bg_video)}")
             future = executor.submit(render_single_optimized, main_video, bg_video, idx)
             futures.append(future)